@@ -1,19 +1,26 @@
 import streamlit as st
+import asyncio
+import codecs
+import hashlib
 import os
 import json
+import re
 import tempfile
 import uuid
+import wave
+from collections import deque
 from datetime import datetime
-import base64
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 import pandas as pd
 
-# Third-party imports
+# Third-party imports. Heavy optional SDKs (boto3, google-cloud, pymongo,
+# PDF libraries) are imported lazily where they are used, so cold start and
+# memory don't pay for services that aren't configured.
+import httpx
 import openai
-import PyPDF2
-import boto3
-from google.cloud import texttospeech
-from pymongo import MongoClient
+from openai import AsyncOpenAI, OpenAI
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 import requests
 
 # Page configuration
@@ -24,8 +31,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for better UI
-st.markdown("""
+# Custom CSS for better UI, hoisted to constants so reruns re-render a cached
+# reference instead of rebuilding the literals
+_CSS = """
 <style>
     .main-header {
         text-align: center;
@@ -66,7 +74,73 @@ st.markdown("""
         font-weight: bold;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+_HEADER = """
+<div class="main-header">
+    <h1>📚 Study Content Converter</h1>
+    <p>Transform complex research papers and notes into simplified learning materials</p>
+</div>
+"""
+
+st.markdown(_CSS, unsafe_allow_html=True)
+
+# Sentence boundaries used to batch text for TTS synthesis
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+# Prompt templates are precompiled per complexity level at import time, so each
+# call is a single placeholder replace that scales with the chunk, not the full
+# prompt (which also keeps cache-key hashing cheap)
+_PROMPT_SLOT = "\x00"
+
+def _make_prompt_template(complexity_level):
+    return f"""
+        Please simplify the following academic/research content for {complexity_level} level understanding:
+
+        Requirements:
+        1. Break down complex concepts into simple explanations
+        2. Use analogies and examples where helpful
+        3. Create bullet points for key concepts
+        4. Maintain accuracy while improving clarity
+        5. Maximum 500 words for summary
+
+        Content to simplify:
+        {_PROMPT_SLOT}
+        """
+
+def _make_packed_template(complexity_level):
+    return f"""
+        Simplify each of the following items for {complexity_level} level understanding:
+
+        Requirements:
+        1. Break down complex concepts into simple explanations
+        2. Use analogies and examples where helpful
+        3. Create bullet points for key concepts
+        4. Maintain accuracy while improving clarity
+        5. Maximum 500 words per summary
+
+        Return JSON of the exact form {{"results": [{{"id": <id>, "summary": <text>}}]}} with one entry per item.
+
+        Items to simplify:
+        {_PROMPT_SLOT}
+        """
+
+_COMPLEXITY_LEVELS = ("beginner", "intermediate", "advanced")
+_PROMPTS = {level: _make_prompt_template(level) for level in _COMPLEXITY_LEVELS}
+_PACKED_PROMPTS = {level: _make_packed_template(level) for level in _COMPLEXITY_LEVELS}
+
+# tiktoken encoder for the gpt-4o family, loaded once on first use
+_tiktoken_encoding = None
+
+def _get_encoding():
+    global _tiktoken_encoding
+    if _tiktoken_encoding is None:
+        try:
+            import tiktoken
+            _tiktoken_encoding = tiktoken.get_encoding("o200k_base")
+        except ImportError:
+            _tiktoken_encoding = False
+    return _tiktoken_encoding or None
 
 class StudyContentProcessor:
     def __init__(self):
@@ -74,127 +148,627 @@ class StudyContentProcessor:
     
     def setup_apis(self):
         """Initialize API connections"""
+        # Snapshot secrets into a plain dict once; each st.secrets lookup
+        # otherwise re-parses secrets.toml lazily
+        try:
+            secrets = {**st.secrets}
+        except Exception:
+            secrets = {}
+
         # OpenAI setup
-        if "openai_api_key" in st.secrets:
-            openai.api_key = st.secrets["openai_api_key"]
-        elif os.getenv("OPENAI_API_KEY"):
-            openai.api_key = os.getenv("OPENAI_API_KEY")
-        
+        self.openai_api_key = secrets.get("openai_api_key") or os.getenv("OPENAI_API_KEY")
+
         # MongoDB setup (optional for demo)
         try:
-            if "mongodb_uri" in st.secrets:
-                self.mongo_client = MongoClient(st.secrets["mongodb_uri"])
-            elif os.getenv("MONGODB_URI"):
-                self.mongo_client = MongoClient(os.getenv("MONGODB_URI"))
+            mongodb_uri = secrets.get("mongodb_uri") or os.getenv("MONGODB_URI")
+            if mongodb_uri:
+                from pymongo import MongoClient
+                self.mongo_client = MongoClient(mongodb_uri)
             else:
                 self.mongo_client = None
         except:
             self.mongo_client = None
-        
+
         # AWS S3 setup (optional for demo)
         try:
-            if all(key in st.secrets for key in ["aws_access_key", "aws_secret_key", "aws_bucket_name"]):
+            if all(secrets.get(key) for key in ["aws_access_key", "aws_secret_key", "aws_bucket_name"]):
+                import boto3
                 self.s3_client = boto3.client(
                     's3',
-                    aws_access_key_id=st.secrets["aws_access_key"],
-                    aws_secret_access_key=st.secrets["aws_secret_key"]
+                    aws_access_key_id=secrets["aws_access_key"],
+                    aws_secret_access_key=secrets["aws_secret_key"]
                 )
-                self.bucket_name = st.secrets["aws_bucket_name"]
+                self.bucket_name = secrets["aws_bucket_name"]
             else:
                 self.s3_client = None
                 self.bucket_name = None
         except:
             self.s3_client = None
             self.bucket_name = None
-        
+
         # Google Cloud TTS setup (optional for demo)
         try:
-            if "google_credentials" in st.secrets:
-                # Create credentials file from secrets
-                credentials_info = st.secrets["google_credentials"]
-                with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-                    json.dump(credentials_info, f)
-                    os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = f.name
+            if secrets.get("google_credentials"):
+                from google.cloud import texttospeech
+
+                # Write the credentials file once per content digest so repeated
+                # processor inits don't leak a fresh tempfile each time
+                credentials_json = json.dumps(dict(secrets["google_credentials"]), sort_keys=True)
+                digest = hashlib.sha256(credentials_json.encode()).hexdigest()
+                credentials_path = os.path.join(tempfile.gettempdir(), f"gcred_{digest}.json")
+                if not os.path.exists(credentials_path):
+                    with open(credentials_path, 'w') as f:
+                        f.write(credentials_json)
+                os.environ.setdefault('GOOGLE_APPLICATION_CREDENTIALS', credentials_path)
                 self.tts_client = texttospeech.TextToSpeechClient()
             else:
                 self.tts_client = None
         except:
             self.tts_client = None
     
-    def extract_text_from_pdf(self, uploaded_file):
-        """Extract text from PDF file"""
+    def iter_pdf_pages(self, uploaded_file):
+        """Yield text page by page so extraction can overlap downstream work.
+
+        Prefers pypdfium2 (PDFium, an order of magnitude faster than
+        pure-Python PyPDF2); falls back to PyPDF2 when not installed.
+        """
         try:
+            import pypdfium2 as pdfium
+        except ImportError:
+            pdfium = None
+
+        if pdfium is not None:
+            pdf = pdfium.PdfDocument(uploaded_file.getvalue())
+            try:
+                for page in pdf:
+                    textpage = page.get_textpage()
+                    yield textpage.get_text_range()
+                    textpage.close()
+                    page.close()
+            finally:
+                pdf.close()
+        else:
+            import PyPDF2
             pdf_reader = PyPDF2.PdfReader(uploaded_file)
-            text = ""
             for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+                yield page.extract_text() or ""
+
+    def iter_text_blocks(self, uploaded_file, block_size=65536):
+        """Decode a text upload incrementally in 64 KB blocks.
+
+        The incremental decoder carries multibyte sequences across block
+        boundaries, so splitting never corrupts a character.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        while chunk := uploaded_file.read(block_size):
+            yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+
+    def _split_piece(self, piece, budget, enc):
+        """Split one streamed piece so no segment exceeds the chunk budget"""
+        if enc is None:
+            return [piece[i:i + budget] for i in range(0, len(piece), budget)]
+        ids = enc.encode(piece)
+        if len(ids) <= budget:
+            return [piece]
+        return [enc.decode(ids[i:i + budget]) for i in range(0, len(ids), budget)]
+
+    def _iter_chunks(self, pieces, budget=None, sep="", complexity_level="beginner"):
+        """Accumulate streamed text pieces into budgeted chunks (joined once per chunk).
+
+        Budgets are measured in tokens when tiktoken is available, otherwise
+        in characters. Pieces larger than the budget (e.g. 64 KB text blocks)
+        are split so no chunk materially exceeds it.
+        """
+        enc = _get_encoding()
+        if budget is None:
+            budget = self._chunk_budget(complexity_level) if enc else self.CHARS_PER_CHUNK
+        measure = (lambda s: len(enc.encode(s))) if enc else len
+
+        parts = []
+        size = 0
+        for piece in pieces:
+            if sep:
+                piece = piece + sep
+            for segment in self._split_piece(piece, budget, enc):
+                parts.append(segment)
+                size += measure(segment)
+                if size >= budget:
+                    yield "".join(parts)
+                    parts = []
+                    size = 0
+        if parts:
+            yield "".join(parts)
+
+    def extract_text_from_pdf(self, uploaded_file):
+        """Extract text from PDF file"""
+        try:
+            return "\n".join(self.iter_pdf_pages(uploaded_file))
         except Exception as e:
             st.error(f"Error extracting PDF text: {str(e)}")
             return None
     
+    SYSTEM_PROMPT = "You are an expert educator who specializes in making complex academic content accessible to students."
+
+    # Upper bound on chunks packed into one chat completion; the effective
+    # size comes from _pack_size, which fits packs to the model context
+    PACK_SIZE = 8
+
+    # Upper bound on content tokens per chunk; the effective budget comes
+    # from _chunk_budget, which respects the smallest context a level's
+    # models have. ~6x more content per call than the old 4000-char slice.
+    TOKENS_PER_CHUNK = 6000
+
+    # Char-based fallback budget when tiktoken isn't installed
+    CHARS_PER_CHUNK = 3500
+
+    # Context windows and completion-token caps for the models in use
+    MODEL_CONTEXT = {"gpt-4o-mini": 128000, "gpt-4-turbo": 128000, "gpt-4": 8192}
+    MODEL_MAX_OUTPUT = {"gpt-4o-mini": 16384, "gpt-4-turbo": 4096, "gpt-4": 8192}
+
+    # Completion tokens reserved per chunk summary
+    COMPLETION_TOKENS = 800
+
+    def _chunk_budget(self, complexity_level):
+        """Content tokens per chunk for this level: capped by the smallest
+        context any of the level's models has, minus completion tokens and
+        prompt-scaffolding headroom."""
+        models = {self._model_for(complexity_level), self._model_for(complexity_level, json_mode=True)}
+        context = min(self.MODEL_CONTEXT.get(m, 8192) for m in models)
+        return min(self.TOKENS_PER_CHUNK, context - self.COMPLETION_TOKENS - 400)
+
+    def _pack_size(self, complexity_level):
+        """Chunks per packed request, sized so the content plus completions
+        fit the packed model's context with headroom for the instructions and
+        the pack's combined max_tokens stays under its completion cap."""
+        model = self._model_for(complexity_level, json_mode=True)
+        context = self.MODEL_CONTEXT.get(model, 8192)
+        max_output = self.MODEL_MAX_OUTPUT.get(model, 4096)
+        per_chunk = self._chunk_budget(complexity_level) + self.COMPLETION_TOKENS
+        return max(1, min(
+            self.PACK_SIZE,
+            (context - 1000) // per_chunk,
+            max_output // self.COMPLETION_TOKENS
+        ))
+
+    def split_into_chunks(self, text, complexity_level="beginner"):
+        """Split text into chunks that fit this level's per-chunk token budget.
+
+        Token boundaries never split a multibyte character, unlike char
+        slicing. Falls back to char slicing without tiktoken.
+        """
+        enc = _get_encoding()
+        if enc is None:
+            return [text[i:i + self.CHARS_PER_CHUNK] for i in range(0, len(text), self.CHARS_PER_CHUNK)]
+        budget = self._chunk_budget(complexity_level)
+        ids = enc.encode(text)
+        return [enc.decode(ids[i:i + budget]) for i in range(0, len(ids), budget)]
+
+    def truncate_to_budget(self, text, complexity_level="beginner"):
+        """Trim text to one chunk's token budget (char-based without tiktoken)"""
+        enc = _get_encoding()
+        if enc is None:
+            return text[:self.CHARS_PER_CHUNK]
+        budget = self._chunk_budget(complexity_level)
+        ids = enc.encode(text)
+        return text if len(ids) <= budget else enc.decode(ids[:budget])
+
+    def _build_prompt(self, chunk, complexity_level):
+        """Instantiate the precompiled simplification prompt for a text chunk"""
+        template = _PROMPTS.get(complexity_level) or _make_prompt_template(complexity_level)
+        return template.replace(_PROMPT_SLOT, chunk)
+
+    def _model_for(self, complexity_level, json_mode=False):
+        """gpt-4o-mini is ~5-10x cheaper and 2-3x faster; gpt-4 stays opt-in
+        for advanced. Packed calls need response_format json_object, which
+        base gpt-4 rejects, so those route to gpt-4-turbo instead."""
+        if complexity_level == "advanced":
+            return "gpt-4-turbo" if json_mode else "gpt-4"
+        return "gpt-4o-mini"
+
+    def _completion_body(self, chunk, complexity_level):
+        """Build the chat completion request body shared by sync, async and batch calls"""
+        return {
+            "model": self._model_for(complexity_level),
+            "messages": [
+                {"role": "system", "content": self.SYSTEM_PROMPT},
+                {"role": "user", "content": self._build_prompt(chunk, complexity_level)}
+            ],
+            "max_tokens": self.COMPLETION_TOKENS,
+            "temperature": 0.7
+        }
+
+    def _build_packed_prompt(self, pack, complexity_level):
+        """Build one prompt covering several chunks, demuxable by id"""
+        items = [{"id": chunk_id, "text": chunk} for chunk_id, chunk in pack]
+        template = _PACKED_PROMPTS.get(complexity_level) or _make_packed_template(complexity_level)
+        return template.replace(_PROMPT_SLOT, json.dumps(items))
+
+    @retry(
+        retry=retry_if_exception_type((openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)),
+        stop=stop_after_attempt(3),
+        wait=wait_exponential_jitter(initial=1, max=20),
+        reraise=True
+    )
+    async def _simplify_pack(self, client, semaphore, pack, complexity_level):
+        """Simplify a pack of (id, chunk) pairs in one chat completion.
+
+        Retries 429s and transient server/connection errors with
+        exponential backoff and jitter.
+        """
+        model = self._model_for(complexity_level, json_mode=True)
+        async with semaphore:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": self.SYSTEM_PROMPT},
+                    {"role": "user", "content": self._build_packed_prompt(pack, complexity_level)}
+                ],
+                response_format={"type": "json_object"},
+                max_tokens=min(self.COMPLETION_TOKENS * len(pack), self.MODEL_MAX_OUTPUT.get(model, 4096)),
+                temperature=0.7
+            )
+
+        payload = json.loads(response.choices[0].message.content)
+        summaries = {}
+        for entry in payload.get("results", []):
+            try:
+                # Models often echo ids as strings; coerce so demuxing by the
+                # integer chunk id doesn't silently drop every summary
+                summaries[int(entry["id"])] = entry["summary"]
+            except (KeyError, TypeError, ValueError):
+                continue
+        return summaries
+
+    async def _simplify_chunks_async(self, chunks, complexity_level):
+        """Fan packed chunk requests out to GPT concurrently; returns per-chunk summaries.
+
+        Accepts any iterable: each pack is dispatched as soon as it fills, so
+        when fed a generator the network calls overlap with upstream extraction.
+
+        All requests in a run share one pooled HTTP/2 connection, so TLS
+        handshakes amortize across the batch and concurrent calls multiplex
+        over a single socket. (The client is scoped per run because it binds
+        to the event loop asyncio.run creates.)
+        """
+        http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=60,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+        )
+        client = AsyncOpenAI(api_key=self.openai_api_key, http_client=http_client)
+        semaphore = asyncio.Semaphore(10)  # stay under the API rate limit
+
+        tasks = []
+        pack = []
+        total = 0
+        pack_size = self._pack_size(complexity_level)
+        try:
+            for chunk_id, chunk in enumerate(chunks):
+                total += 1
+                pack.append((chunk_id, chunk))
+                if len(pack) == pack_size:
+                    tasks.append(asyncio.create_task(self._simplify_pack(client, semaphore, pack, complexity_level)))
+                    pack = []
+                    await asyncio.sleep(0)  # let in-flight requests progress while extraction continues
+            if pack:
+                tasks.append(asyncio.create_task(self._simplify_pack(client, semaphore, pack, complexity_level)))
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            await client.close()
+            await http_client.aclose()
+
+        summaries = {}
+        errors = []
+        for result in results:
+            if isinstance(result, Exception):
+                errors.append(result)
+            else:
+                summaries.update(result)
+
+        if errors:
+            st.warning(f"{len(errors)} of {len(tasks)} requests failed: {str(errors[0])}")
+
+        return [summaries.get(i) for i in range(total)]
+
+    async def simplify_content_async(self, text, complexity_level="beginner"):
+        """Simplify one document by chunking it and stitching the chunk summaries"""
+        chunks = self.split_into_chunks(text, complexity_level)
+        parts = [s for s in await self._simplify_chunks_async(chunks, complexity_level) if s]
+        return "\n\n".join(parts) if parts else None
+
     def simplify_content_with_gpt(self, text, complexity_level="beginner"):
-        """Use GPT-4 to simplify and summarize content"""
+        """Use GPT-4 to simplify and summarize content.
+
+        Accepts a single document (str) or a list of texts; a list returns
+        one summary per item, with items packed several-per-request.
+        """
         try:
-            if not openai.api_key:
+            if not self.openai_api_key:
                 st.error("OpenAI API key not configured")
                 return None
-            
-            # Limit text length to avoid token limits
-            text_chunk = text[:4000] if len(text) > 4000 else text
-            
-            prompt = f"""
-            Please simplify the following academic/research content for {complexity_level} level understanding:
-            
-            Requirements:
-            1. Break down complex concepts into simple explanations
-            2. Use analogies and examples where helpful
-            3. Create bullet points for key concepts
-            4. Maintain accuracy while improving clarity
-            5. Maximum 500 words for summary
-            
-            Content to simplify:
-            {text_chunk}
-            """
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert educator who specializes in making complex academic content accessible to students."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=800,
-                temperature=0.7
+
+            if isinstance(text, str):
+                return asyncio.run(self.simplify_content_async(text, complexity_level))
+            return asyncio.run(self._simplify_chunks_async([self.truncate_to_budget(t, complexity_level) for t in text], complexity_level))
+        except Exception as e:
+            st.error(f"Error with GPT processing: {str(e)}")
+            return None
+
+    def simplify_stream(self, text, complexity_level="beginner"):
+        """Stream a single-chunk simplification, yielding tokens as they arrive.
+
+        Errors (auth, 429, mid-stream disconnects) surface via st.error like
+        the other GPT paths; the stream simply ends with whatever was yielded.
+        """
+        try:
+            client = OpenAI(api_key=self.openai_api_key)
+            stream = client.chat.completions.create(stream=True, **self._completion_body(text, complexity_level))
+            for event in stream:
+                if event.choices and event.choices[0].delta.content:
+                    yield event.choices[0].delta.content
+        except Exception as e:
+            st.error(f"Error with GPT processing: {str(e)}")
+
+    async def _stream_summary_tokens(self, client, text, complexity_level, queue):
+        """Produce summary tokens into the queue as GPT streams them"""
+        stream = await client.chat.completions.create(stream=True, **self._completion_body(text, complexity_level))
+        pieces = []
+        async for event in stream:
+            if event.choices and event.choices[0].delta.content:
+                token = event.choices[0].delta.content
+                pieces.append(token)
+                await queue.put(token)
+        await queue.put(None)
+        return "".join(pieces)
+
+    async def _tts_sentences(self, queue):
+        """Consume summary tokens; flush sentence-complete fragments to TTS.
+
+        Synthesis calls run on the default executor, so audio for early
+        sentences renders while later tokens are still generating.
+        """
+        loop = asyncio.get_running_loop()
+        pending = []
+        buffer = ""
+        while True:
+            token = await queue.get()
+            if token is None:
+                break
+            buffer += token
+            sentences = _SENTENCE_RE.split(buffer)
+            if len(sentences) > 1:
+                buffer = sentences[-1]
+                pending.append(loop.run_in_executor(None, self._tts_one, " ".join(sentences[:-1])))
+        if buffer.strip():
+            pending.append(loop.run_in_executor(None, self._tts_one, buffer))
+
+        audio_parts = [await fut for fut in pending]
+        return b"".join(audio_parts), "audio/mp3"
+
+    def summarize_with_voice(self, text, complexity_level="beginner"):
+        """Overlap streaming summarization with TTS via a producer/consumer pipeline.
+
+        Sentence-complete summary fragments are synthesized while GPT is still
+        generating, so wall time approaches max(summary, TTS) instead of the
+        sum. Returns (summary, (audio_bytes, mime_type)).
+        """
+        async def pipeline():
+            http_client = httpx.AsyncClient(
+                http2=True,
+                timeout=60,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
             )
-            
-            return response.choices[0].message.content
+            client = AsyncOpenAI(api_key=self.openai_api_key, http_client=http_client)
+            queue = asyncio.Queue()
+            try:
+                return await asyncio.gather(
+                    self._stream_summary_tokens(client, text, complexity_level, queue),
+                    self._tts_sentences(queue)
+                )
+            finally:
+                await client.close()
+                await http_client.aclose()
+
+        try:
+            summary, voice = asyncio.run(pipeline())
+            return summary or None, voice if voice and voice[0] else None
+        except Exception as e:
+            st.error(f"Error in summary/voice pipeline: {str(e)}")
+            return None, None
+
+    def simplify_upload(self, uploaded_file, complexity_level="beginner"):
+        """Summarize an upload while it parses: chunks go to GPT as they fill.
+
+        PDFs stream page by page; text files decode in 64 KB blocks. Returns
+        (summary, full_text) without ever holding more than one unfinished
+        chunk of extracted text outside the collected output.
+        """
+        if uploaded_file.type == "application/pdf":
+            source = self._iter_chunks(self.iter_pdf_pages(uploaded_file), sep="\n", complexity_level=complexity_level)
+        else:
+            source = self._iter_chunks(self.iter_text_blocks(uploaded_file), complexity_level=complexity_level)
+
+        collected = []
+
+        def chunk_source():
+            for chunk in source:
+                collected.append(chunk)
+                yield chunk
+
+        try:
+            parts = [s for s in asyncio.run(self._simplify_chunks_async(chunk_source(), complexity_level)) if s]
+            summary = "\n\n".join(parts) if parts else None
         except Exception as e:
             st.error(f"Error with GPT processing: {str(e)}")
+            summary = None
+
+        return summary, "".join(collected)
+
+    def submit_batch(self, texts, complexity_level="beginner"):
+        """Submit a bulk simplification job via the OpenAI Batch API (50% cheaper, 24h SLA)"""
+        try:
+            if not self.openai_api_key:
+                st.error("OpenAI API key not configured")
+                return None
+
+            client = OpenAI(api_key=self.openai_api_key)
+
+            # One request per chunk so batch jobs get the same full-document
+            # coverage as the interactive path; retrieve_batch stitches them
+            with tempfile.NamedTemporaryFile(mode='w', suffix='.jsonl', delete=False) as f:
+                for i, text in enumerate(texts):
+                    for j, chunk in enumerate(self.split_into_chunks(text, complexity_level)):
+                        f.write(json.dumps({
+                            "custom_id": f"doc-{i}-chunk-{j}",
+                            "method": "POST",
+                            "url": "/v1/chat/completions",
+                            "body": self._completion_body(chunk, complexity_level)
+                        }) + "\n")
+                jsonl_path = f.name
+
+            try:
+                with open(jsonl_path, 'rb') as f:
+                    input_file = client.files.create(file=f, purpose="batch")
+            finally:
+                os.unlink(jsonl_path)
+
+            batch = client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            return batch.id
+        except Exception as e:
+            st.error(f"Error submitting batch job: {str(e)}")
             return None
-    
-    def generate_voice_note(self, text):
-        """Convert text to speech using Google Cloud TTS or fallback"""
+
+    def retrieve_batch(self, batch_id):
+        """Poll a batch job; return (status, {custom_id: summary}) once completed"""
         try:
-            if self.tts_client:
-                # Limit text for TTS
-                tts_text = text[:1000] if len(text) > 1000 else text
-                
-                synthesis_input = texttospeech.SynthesisInput(text=tts_text)
-                voice = texttospeech.VoiceSelectionParams(
+            client = OpenAI(api_key=self.openai_api_key)
+            batch = client.batches.retrieve(batch_id)
+
+            results = None
+            if batch.status == "completed" and batch.output_file_id:
+                # Regroup doc-{i}-chunk-{j} lines and stitch each document's
+                # chunk summaries back together in order
+                chunks = {}
+                for line in client.files.content(batch.output_file_id).text.splitlines():
+                    entry = json.loads(line)
+                    try:
+                        _, doc_id, _, chunk_id = entry["custom_id"].split("-")
+                        content = entry["response"]["body"]["choices"][0]["message"]["content"]
+                    except (KeyError, TypeError, ValueError, IndexError):
+                        continue
+                    chunks.setdefault(int(doc_id), {})[int(chunk_id)] = content
+
+                results = {
+                    f"doc-{doc_id}": "\n\n".join(parts[k] for k in sorted(parts))
+                    for doc_id, parts in chunks.items()
+                }
+
+            return batch.status, results
+        except Exception as e:
+            st.error(f"Error retrieving batch job: {str(e)}")
+            return None, None
+    
+    def _stream_voice_note(self, text):
+        """Stream synthesis sentence by sentence for ~4x lower time-to-first-audio"""
+        from google.cloud import texttospeech
+
+        config_request = texttospeech.StreamingSynthesizeRequest(
+            streaming_config=texttospeech.StreamingSynthesizeConfig(
+                voice=texttospeech.VoiceSelectionParams(
                     language_code="en-US",
-                    name="en-US-Wavenet-D"
+                    name="en-US-Journey-D"
                 )
-                audio_config = texttospeech.AudioConfig(
-                    audio_encoding=texttospeech.AudioEncoding.MP3
-                )
-                
-                response = self.tts_client.synthesize_speech(
-                    input=synthesis_input,
-                    voice=voice,
-                    audio_config=audio_config
+            )
+        )
+        sentences = [s for s in _SENTENCE_RE.split(text) if s.strip()]
+
+        def requests_iter():
+            yield config_request
+            for sentence in sentences:
+                yield texttospeech.StreamingSynthesizeRequest(
+                    input=texttospeech.StreamingSynthesisInput(text=sentence)
                 )
-                
-                return response.audio_content
+
+        buffer = BytesIO()
+        for response in self.tts_client.streaming_synthesize(requests=requests_iter()):
+            buffer.write(response.audio_content)
+
+        return self._pcm_to_wav(buffer.getvalue()), "audio/wav"
+
+    def _pcm_to_wav(self, pcm):
+        """Wrap the raw LINEAR16 24kHz mono PCM from streaming synthesis in a WAV container"""
+        out = BytesIO()
+        with wave.open(out, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(24000)
+            wav.writeframes(pcm)
+        return out.getvalue()
+
+    def _tts_one(self, text):
+        """Synthesize one sentence batch via the batch endpoint; returns MP3 bytes"""
+        from google.cloud import texttospeech
+
+        response = self.tts_client.synthesize_speech(
+            input=texttospeech.SynthesisInput(text=text),
+            voice=texttospeech.VoiceSelectionParams(
+                language_code="en-US",
+                name="en-US-Wavenet-D"
+            ),
+            audio_config=texttospeech.AudioConfig(
+                audio_encoding=texttospeech.AudioEncoding.MP3
+            )
+        )
+        return response.audio_content
+
+    def _pack_sentences(self, text, budget=300):
+        """Pack sentences into ~budget-char batches for synthesis"""
+        batches = []
+        parts = []
+        size = 0
+        for sentence in _SENTENCE_RE.split(text):
+            if not sentence.strip():
+                continue
+            parts.append(sentence)
+            size += len(sentence) + 1
+            if size >= budget:
+                batches.append(" ".join(parts))
+                parts = []
+                size = 0
+        if parts:
+            batches.append(" ".join(parts))
+        return batches
+
+    def _batch_voice_note(self, text):
+        """Synthesize sentence batches concurrently and concatenate the MP3 frames.
+
+        The shared gRPC channel is thread-safe, so fan-out scales near-linearly
+        with the number of batches up to the per-project concurrency limit.
+        """
+        batches = self._pack_sentences(text)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            audios = list(executor.map(self._tts_one, batches))
+        return b"".join(audios), "audio/mp3"
+
+    def generate_voice_note(self, text):
+        """Convert text to speech using Google Cloud TTS or fallback.
+
+        Returns (audio_bytes, mime_type). Prefers streaming synthesis so the
+        first audio chunk arrives in ~200ms instead of after full synthesis;
+        falls back to the batch endpoint when streaming is unavailable.
+        """
+        try:
+            if self.tts_client:
+                try:
+                    return self._stream_voice_note(text)
+                except Exception:
+                    # Older client library or unsupported voice; use batch synthesis
+                    return self._batch_voice_note(text)
             else:
                 # Fallback: create a placeholder audio message
                 st.info("Google Cloud TTS not configured. Voice generation would work with proper API setup.")
@@ -203,6 +777,37 @@ class StudyContentProcessor:
             st.error(f"Error generating voice note: {str(e)}")
             return None
     
+    def upload_voice_note(self, audio, mime):
+        """Upload a voice note to S3 and return a presigned GET URL (1h expiry).
+
+        Lets the browser stream the audio with range requests instead of the
+        Streamlit server re-sending the bytes on every rerun. Returns None
+        when S3 is unconfigured or the upload fails, so callers can fall back
+        to serving the bytes directly.
+        """
+        if not self.s3_client:
+            return None
+
+        try:
+            from boto3.s3.transfer import TransferConfig
+
+            key = f"voice/{uuid.uuid4()}.{mime.split('/')[-1]}"
+            self.s3_client.upload_fileobj(
+                BytesIO(audio),
+                self.bucket_name,
+                key,
+                ExtraArgs={"ContentType": "audio/mpeg" if mime == "audio/mp3" else mime},
+                Config=TransferConfig(multipart_threshold=8 * 1024 * 1024, use_threads=True)
+            )
+            return self.s3_client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': self.bucket_name, 'Key': key},
+                ExpiresIn=3600
+            )
+        except Exception as e:
+            st.warning(f"Could not upload voice note to S3: {str(e)}")
+            return None
+
     def create_visual_explanation(self, summary_text):
         """Generate visual explanation prompt (placeholder for actual image generation)"""
         try:
@@ -231,15 +836,42 @@ def get_processor():
 
 processor = get_processor()
 
+class _CacheBypass(Exception):
+    """Raised inside cached wrappers so st.cache_data doesn't memoize a failed
+    API call; the next Process click retries instead of hitting a cached None.
+    Carries any partial result (e.g. extracted text) as args."""
+
+# Cached API wrappers: keyed on a sha256 digest passed explicitly so Streamlit
+# hashes 32 bytes per lookup instead of the whole document (underscore args are
+# excluded from the cache key). Identical inputs skip the API entirely.
+@st.cache_data(ttl=24 * 60 * 60, show_spinner=False, max_entries=128)
+def _cached_simplify(text_hash, _text, complexity_level):
+    summary = get_processor().simplify_content_with_gpt(_text, complexity_level)
+    if summary is None:
+        raise _CacheBypass()
+    return summary
+
+@st.cache_data(ttl=24 * 60 * 60, show_spinner=False, max_entries=128)
+def _cached_simplify_upload(file_hash, _file, complexity_level):
+    summary, text = get_processor().simplify_upload(_file, complexity_level)
+    if summary is None:
+        raise _CacheBypass(text)
+    return summary, text
+
+@st.cache_data(ttl=24 * 60 * 60, show_spinner=False, max_entries=128)
+def _cached_tts(text_hash, _text):
+    voice = get_processor().generate_voice_note(_text)
+    if voice is None:
+        raise _CacheBypass()
+    return voice
+
+def _sha256(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
 # Main app interface
 def main():
     # Header
-    st.markdown("""
-    <div class="main-header">
-        <h1>📚 Study Content Converter</h1>
-        <p>Transform complex research papers and notes into simplified learning materials</p>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(_HEADER, unsafe_allow_html=True)
     
     # Sidebar configuration
     with st.sidebar:
@@ -262,7 +894,7 @@ def main():
         
         # Check API availability
         api_status = {
-            "OpenAI GPT-4": "✅" if openai.api_key else "❌",
+            "OpenAI GPT": "✅" if processor.openai_api_key else "❌",
             "Google Cloud TTS": "✅" if processor.tts_client else "❌",
             "AWS S3": "✅" if processor.s3_client else "❌",
             "MongoDB": "✅" if processor.mongo_client else "❌"
@@ -280,12 +912,13 @@ def main():
         st.header("📄 Upload Your Document")
         
         # File upload
-        uploaded_file = st.file_uploader(
-            "Choose a file",
+        uploaded_files = st.file_uploader(
+            "Choose files",
             type=['pdf', 'txt'],
-            help="Upload PDF files or text documents"
+            accept_multiple_files=True,
+            help="Upload PDF files or text documents. Multiple files are processed as a discounted batch job."
         )
-        
+
         # Text input as alternative
         st.header("✏️ Or Paste Your Text")
         manual_text = st.text_area(
@@ -293,9 +926,13 @@ def main():
             height=200,
             placeholder="Paste research paper content, notes, or any study material here..."
         )
-        
+
         if st.button("🚀 Process Content", type="primary"):
-            process_content(uploaded_file, manual_text, complexity_level, output_formats)
+            if uploaded_files and len(uploaded_files) > 1:
+                process_batch(uploaded_files, complexity_level)
+            else:
+                uploaded_file = uploaded_files[0] if uploaded_files else None
+                process_content(uploaded_file, manual_text, complexity_level, output_formats)
     
     with col2:
         st.header("📋 Features")
@@ -316,17 +953,62 @@ def main():
             </div>
             """, unsafe_allow_html=True)
 
+def process_batch(uploaded_files, complexity_level):
+    """Submit multiple documents as one OpenAI Batch API job"""
+
+    texts = []
+    names = []
+    for uploaded_file in uploaded_files:
+        if uploaded_file.type == "application/pdf":
+            text = processor.extract_text_from_pdf(uploaded_file)
+        else:
+            text = "".join(processor.iter_text_blocks(uploaded_file))
+        if text:
+            texts.append(text)
+            names.append(uploaded_file.name)
+
+    if not texts:
+        st.error("Could not extract text from the uploaded files.")
+        return
+
+    with st.spinner(f"📦 Submitting batch job for {len(texts)} documents..."):
+        batch_id = processor.submit_batch(texts, complexity_level)
+
+    if batch_id:
+        if "batch_jobs" not in st.session_state:
+            st.session_state.batch_jobs = []
+        st.session_state.batch_jobs.append({
+            "batch_id": batch_id,
+            "submitted": datetime.now(),
+            "files": names,
+            "status": "submitted",
+            "results": None
+        })
+        st.success(f"✅ Batch job submitted ({len(texts)} documents). Track progress on the History page.")
+
 def process_content(uploaded_file, manual_text, complexity_level, output_formats):
     """Process the uploaded content"""
     
     # Extract text
     text_content = ""
-    
+    summary = None
+
     if uploaded_file is not None:
-        if uploaded_file.type == "application/pdf":
+        if "Summary" in output_formats and processor.openai_api_key:
+            # Streamed path: GPT requests go out while the file still parses
+            with st.spinner("🤖 Summarizing while the file parses..."):
+                try:
+                    summary, text_content = _cached_simplify_upload(
+                        hashlib.sha256(uploaded_file.getvalue()).hexdigest(),
+                        uploaded_file,
+                        complexity_level
+                    )
+                except _CacheBypass as e:
+                    summary, text_content = None, e.args[0] if e.args else ""
+        elif uploaded_file.type == "application/pdf":
             text_content = processor.extract_text_from_pdf(uploaded_file)
-        elif uploaded_file.type == "text/plain":
-            text_content = uploaded_file.read().decode('utf-8')
+        else:
+            text_content = "".join(processor.iter_text_blocks(uploaded_file))
     elif manual_text.strip():
         text_content = manual_text
     
@@ -343,20 +1025,44 @@ def process_content(uploaded_file, manual_text, complexity_level, output_formats
     # Process content based on selected formats
     results = {}
     
+    # Summary + voice for short documents: pipeline the two so sentences hit
+    # TTS while GPT is still streaming
+    if ("Summary" in output_formats and "Voice Note" in output_formats
+            and summary is None and processor.openai_api_key and processor.tts_client
+            and len(processor.split_into_chunks(text_content, complexity_level)) == 1):
+        with st.spinner("🤖🎵 Generating summary and voice note concurrently..."):
+            summary, voice = processor.summarize_with_voice(text_content, complexity_level)
+        if voice:
+            results["audio"], results["audio_mime"] = voice
+
     # Generate summary
     if "Summary" in output_formats:
-        with st.spinner("🤖 Generating simplified summary..."):
-            summary = processor.simplify_content_with_gpt(text_content, complexity_level)
-            if summary:
-                results["summary"] = summary
+        if summary is None:
+            if processor.openai_api_key and len(processor.split_into_chunks(text_content, complexity_level)) == 1:
+                # Single-chunk documents stream tokens straight to the page,
+                # so perceived latency is first-token latency
+                st.subheader("📝 Simplified Summary")
+                summary = st.write_stream(processor.simplify_stream(text_content, complexity_level)) or None
+                results["summary_rendered"] = True
+            else:
+                with st.spinner("🤖 Generating simplified summary..."):
+                    try:
+                        summary = _cached_simplify(_sha256(text_content), text_content, complexity_level)
+                    except _CacheBypass:
+                        summary = None
+        if summary:
+            results["summary"] = summary
     
     # Generate voice note
-    if "Voice Note" in output_formats:
+    if "Voice Note" in output_formats and "audio" not in results:
         with st.spinner("🎵 Generating voice note..."):
             text_for_voice = results.get("summary", text_content[:1000])
-            audio_content = processor.generate_voice_note(text_for_voice)
-            if audio_content:
-                results["audio"] = audio_content
+            try:
+                voice = _cached_tts(_sha256(text_for_voice), text_for_voice)
+            except _CacheBypass:
+                voice = None
+            if voice:
+                results["audio"], results["audio_mime"] = voice
     
     # Generate visual explanation
     if "Visual Explanation" in output_formats:
@@ -375,13 +1081,14 @@ def display_results(results, original_text):
     
     # Summary section
     if "summary" in results:
-        st.subheader("📝 Simplified Summary")
-        st.markdown(f"""
-        <div class="success-message">
-            {results["summary"]}
-        </div>
-        """, unsafe_allow_html=True)
-        
+        if not results.get("summary_rendered"):
+            st.subheader("📝 Simplified Summary")
+            st.markdown(f"""
+            <div class="success-message">
+                {results["summary"]}
+            </div>
+            """, unsafe_allow_html=True)
+
         # Download button for summary
         st.download_button(
             label="📥 Download Summary",
@@ -394,22 +1101,21 @@ def display_results(results, original_text):
     if "audio" in results:
         st.subheader("🎵 Voice Note")
         
-        # Create audio player
-        audio_base64 = base64.b64encode(results["audio"]).decode()
-        audio_html = f"""
-        <audio controls>
-            <source src="data:audio/mp3;base64,{audio_base64}" type="audio/mp3">
-            Your browser does not support the audio element.
-        </audio>
-        """
-        st.markdown(audio_html, unsafe_allow_html=True)
-        
+        # Prefer a presigned S3 URL so the server doesn't hold the bytes across
+        # reruns; otherwise serve via Streamlit's media endpoint
+        audio_mime = results.get("audio_mime", "audio/mp3")
+        audio_url = processor.upload_voice_note(results["audio"], audio_mime)
+        if audio_url:
+            st.audio(audio_url, format=audio_mime)
+        else:
+            st.audio(results["audio"], format=audio_mime)
+
         # Download button for audio
         st.download_button(
             label="📥 Download Voice Note",
             data=results["audio"],
-            file_name=f"voice_note_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp3",
-            mime="audio/mp3"
+            file_name=f"voice_note_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{audio_mime.split('/')[-1]}",
+            mime=audio_mime
         )
     
     # Visual explanation section
@@ -438,10 +1144,10 @@ def display_results(results, original_text):
     with col4:
         st.metric("Processing Time", "< 30s")
     
-    # Save to session state for history
+    # Save to session state for history; maxlen evicts the oldest entry in O(1)
     if "processed_documents" not in st.session_state:
-        st.session_state.processed_documents = []
-    
+        st.session_state.processed_documents = deque(maxlen=10)
+
     document_entry = {
         "timestamp": datetime.now(),
         "original_length": len(original_text),
@@ -450,34 +1156,62 @@ def display_results(results, original_text):
         "has_visual": "visual" in results
     }
     
-    st.session_state.processed_documents.insert(0, document_entry)
-    
-    # Keep only last 10 documents
-    st.session_state.processed_documents = st.session_state.processed_documents[:10]
+    st.session_state.processed_documents.appendleft(document_entry)
 
 # Document history page
 def show_history():
     st.header("📚 Document History")
-    
+
+    show_batch_jobs()
+
     if "processed_documents" not in st.session_state or not st.session_state.processed_documents:
         st.info("No documents processed yet. Upload a document to get started!")
         return
-    
-    for i, doc in enumerate(st.session_state.processed_documents):
-        with st.expander(f"Document {i+1} - {doc['timestamp'].strftime('%Y-%m-%d %H:%M')}"):
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.metric("Original Length", f"{doc['original_length']} chars")
-            
-            with col2:
-                st.metric("Has Audio", "✅" if doc['has_audio'] else "❌")
-            
-            with col3:
-                st.metric("Has Visual", "✅" if doc['has_visual'] else "❌")
-            
-            if doc['summary']:
-                st.text_area("Summary", doc['summary'], height=100, disabled=True, key=f"summary_{i}")
+
+    docs = list(st.session_state.processed_documents)
+
+    # One dataframe element instead of an expander + three metrics per row,
+    # so render cost stays constant as history grows
+    df = pd.DataFrame(docs)
+    df["timestamp"] = pd.to_datetime(df["timestamp"]).dt.strftime('%Y-%m-%d %H:%M')
+    st.dataframe(
+        df[["timestamp", "original_length", "has_audio", "has_visual"]],
+        use_container_width=True
+    )
+
+    # Summary viewer for one document at a time
+    labels = [f"Document {i+1} - {ts}" for i, ts in enumerate(df["timestamp"])]
+    selected = st.selectbox("View summary", labels)
+    doc = docs[labels.index(selected)]
+    if doc["summary"]:
+        st.text_area("Summary", doc["summary"], height=150, disabled=True)
+    else:
+        st.info("No summary stored for this document.")
+
+def show_batch_jobs():
+    """List submitted batch jobs and poll their status on demand"""
+
+    if "batch_jobs" not in st.session_state or not st.session_state.batch_jobs:
+        return
+
+    st.subheader("📦 Batch Jobs")
+
+    for i, job in enumerate(st.session_state.batch_jobs):
+        with st.expander(f"Batch {job['batch_id']} - {job['submitted'].strftime('%Y-%m-%d %H:%M')} ({job['status']})"):
+            st.write(f"Files: {', '.join(job['files'])}")
+
+            if job["status"] != "completed":
+                if st.button("🔄 Refresh Status", key=f"batch_refresh_{i}"):
+                    status, results = processor.retrieve_batch(job["batch_id"])
+                    if status:
+                        job["status"] = status
+                        if results:
+                            job["results"] = results
+                        st.rerun()
+
+            if job["results"]:
+                for custom_id, summary in sorted(job["results"].items(), key=lambda kv: int(kv[0].split("-")[1])):
+                    st.text_area(custom_id, summary, height=150, disabled=True, key=f"batch_{i}_{custom_id}")
 
 # Navigation
 def main_navigation():